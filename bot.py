@@ -5,6 +5,8 @@ from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import gspread
 from google.oauth2.service_account import Credentials
+from location_index import LatestPositionIndex, format_candidates, format_stale, format_where, maps_link, parse_stale_hours
+from route_buffer import RouteStore, format_route
 
 # ===========================================
 # LOGGER AYARLARI
@@ -25,6 +27,16 @@ logger.info("=" * 60)
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 GOOGLE_SHEET_NAME = os.getenv('GOOGLE_SHEET_NAME', 'Deren Kimya Saha Ziyaret Optimizasyonu')
 ADMIN_TELEGRAM_IDS = os.getenv('ADMIN_TELEGRAM_IDS', '410711923').split(',')
+STALE_HOURS = float(os.getenv('STALE_HOURS', '4'))
+POSITION_INDEX_MAX_ROWS = int(os.getenv('POSITION_INDEX_MAX_ROWS', '50000'))
+ROUTE_MEMORY_BUDGET_KB = int(os.getenv('ROUTE_MEMORY_BUDGET_KB', '2048'))
+ROUTE_POINTS_PER_USER = int(os.getenv('ROUTE_POINTS_PER_USER', '720'))
+
+# Mühendislerin son konumları (her kayıtta güncellenir, açılışta Sheets'ten yüklenir)
+position_index = LatestPositionIndex()
+
+# Mühendislerin günlük rotaları (kayıtlarla aynı veriden beslenir)
+route_store = RouteStore(ROUTE_MEMORY_BUDGET_KB * 1024, ROUTE_POINTS_PER_USER)
 
 # ===========================================
 # GOOGLE SHEETS BAĞLANTISI
@@ -69,8 +81,9 @@ def save_location_to_sheets(telegram_id: int, user_name: str, latitude: float, l
             logger.error("❌ Sheet bağlantısı yok")
             return False
         
-        timestamp = datetime.now().strftime("%d.%m.%Y %H:%M:%S")
-        google_maps_url = f"https://www.google.com/maps?q={latitude},{longitude}"
+        now = datetime.now()
+        timestamp = now.strftime("%d.%m.%Y %H:%M:%S")
+        google_maps_url = maps_link(latitude, longitude)
         
         row = [
             timestamp,
@@ -84,6 +97,8 @@ def save_location_to_sheets(telegram_id: int, user_name: str, latitude: float, l
         ]
         
         sheet.append_row(row)
+        position_index.update(telegram_id, user_name, latitude, longitude, now)
+        route_store.add(telegram_id, latitude, longitude, now)
         logger.info(f"✅ Konum kaydedildi: {user_name} | {latitude},{longitude}")
         return True
         
@@ -91,6 +106,38 @@ def save_location_to_sheets(telegram_id: int, user_name: str, latitude: float, l
         logger.error(f"❌ Konum kaydetme hatası: {e}")
         return False
 
+# ===========================================
+# SON KONUM İNDEKSİ
+# ===========================================
+def load_position_index():
+    """Son konum indeksini ve bugünkü rotaları Sheets'in son satırlarından tek okumayla doldur"""
+    try:
+        sheet = get_google_sheet()
+        if not sheet:
+            logger.error("❌ Sheet bağlantısı yok, konum indeksi boş başlıyor")
+            return
+        
+        # Sadece son POSITION_INDEX_MAX_ROWS satır okunur (append_row yeni satırları sona ekler)
+        first_row = max(2, sheet.row_count - POSITION_INDEX_MAX_ROWS + 1)
+        rows = sheet.get_values(f"A{first_row}:F{sheet.row_count}")
+        today = datetime.now().date()
+        for row in rows:
+            try:
+                timestamp = datetime.strptime(row[0], "%d.%m.%Y %H:%M:%S")
+                telegram_id = int(row[2])
+                latitude = float(row[4])
+                longitude = float(row[5])
+            except (IndexError, ValueError):
+                continue
+            position_index.update(telegram_id, row[1], latitude, longitude, timestamp)
+            if timestamp.date() == today:
+                route_store.add(telegram_id, latitude, longitude, timestamp)
+        
+        logger.info(f"✅ Konum indeksi yüklendi: {len(position_index)} kullanıcı, {len(route_store)} günlük rota")
+        
+    except Exception as e:
+        logger.error(f"❌ Konum indeksi yükleme hatası: {e}")
+
 # ===========================================
 # SHEETS TEMİZLEME (ADMIN)
 # ===========================================
@@ -143,7 +190,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_admin(telegram_id):
         message += "\n\n🔧 Admin Komutları:\n"
         message += "/clear - Sheets'teki tüm veriyi temizle\n"
-        message += "/count - Kayıtlı konum sayısı"
+        message += "/count - Kayıtlı konum sayısı\n"
+        message += "/where - Mühendislerin son konumları\n"
+        message += "/route <isim> - Bugünkü rota ve mesafe\n"
+        message += f"/stale [saat] - {STALE_HOURS:g} saattir konum göndermeyenler"
     
     await update.message.reply_text(message)
 
@@ -162,7 +212,7 @@ async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
     success = save_location_to_sheets(telegram_id, user_name, latitude, longitude, phone)
     
     if success:
-        google_maps_url = f"https://www.google.com/maps?q={latitude},{longitude}"
+        google_maps_url = maps_link(latitude, longitude)
         await update.message.reply_text(
             f"✅ Konum başarıyla kaydedildi!\n\n"
             f"👤 {user_name}\n"
@@ -210,6 +260,9 @@ async def clear_confirm_command(update: Update, context: ContextTypes.DEFAULT_TY
     success = clear_sheets_data()
     
     if success:
+        # Silinen kayıtlar bellekteki indeks ve rotalarda da kalmasın
+        position_index.clear()
+        route_store.clear()
         await update.message.reply_text(
             "✅ Google Sheets başarıyla temizlendi!\n\n"
             "Tüm konum kayıtları silindi."
@@ -251,6 +304,71 @@ async def count_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"❌ Count hatası: {e}")
         await update.message.reply_text("❌ İstatistik alınırken hata oluştu!")
 
+async def where_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mühendislerin son konumlarını göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"🗺️ /where komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    for message in format_where(position_index.latest(), STALE_HOURS):
+        await update.message.reply_text(message, disable_web_page_preview=True)
+
+async def route_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bir mühendisin bugünkü rotasını göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"🛣️ /route komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    if not context.args:
+        await update.message.reply_text("❌ Kullanım: /route <isim veya Telegram ID>")
+        return
+    
+    query = " ".join(context.args)
+    matches = position_index.find(query)
+    if not matches:
+        await update.message.reply_text(f"❌ Kullanıcı bulunamadı: {query}")
+        return
+    if len(matches) > 1:
+        await update.message.reply_text(format_candidates(query, matches))
+        return
+    
+    target_id, position = matches[0]
+    await update.message.reply_text(
+        format_route(position.name, route_store.today(target_id), route_store.wrapped(target_id), position.timestamp),
+        disable_web_page_preview=True
+    )
+
+async def stale_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Uzun süredir konum göndermeyenleri göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"⏰ /stale komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    hours = STALE_HOURS
+    if context.args:
+        hours = parse_stale_hours(context.args[0])
+        if hours is None:
+            await update.message.reply_text("❌ Kullanım: /stale [saat]")
+            return
+    
+    for message in format_stale(position_index.stale(hours), hours, position_index.missing()):
+        await update.message.reply_text(message)
+
 # ===========================================
 # ANA FONKSİYON
 # ===========================================
@@ -260,12 +378,17 @@ def main():
     logger.info("📝 Mod: Herkes konum gönderebilir")
     logger.info(f"🔧 Admin Telegram IDs: {ADMIN_TELEGRAM_IDS}")
     
+    load_position_index()
+    
     application = Application.builder().token(TELEGRAM_TOKEN).build()
     
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("clear", clear_command))
     application.add_handler(CommandHandler("clearconfirm", clear_confirm_command))
     application.add_handler(CommandHandler("count", count_command))
+    application.add_handler(CommandHandler("where", where_command))
+    application.add_handler(CommandHandler("route", route_command))
+    application.add_handler(CommandHandler("stale", stale_command))
     application.add_handler(MessageHandler(filters.LOCATION, handle_location))
     
     logger.info("✅ Bot çalışıyor ve konum bekliyor...")
@@ -1,10 +1,14 @@
 import os
+import asyncio
 import logging
 from datetime import datetime
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import mysql.connector
 from mysql.connector import Error
+from location_index import LatestPositionIndex, format_candidates, format_stale, format_where, maps_link, parse_stale_hours
+from route_buffer import RouteStore, format_route
+from migrate import list_partitions, missing_partition_months, pending_migrations
 
 # ===========================================
 # LOGGER AYARLARI
@@ -28,6 +32,77 @@ DB_NAME = os.getenv('DB_NAME')
 DB_USER = os.getenv('DB_USER')
 DB_PASS = os.getenv('DB_PASS')
 DB_PORT = os.getenv('DB_PORT', '3306')
+DB_DRIVER = os.getenv('DB_DRIVER', 'sync').lower()  # sync: mysql.connector, async: aiomysql havuzu
+DB_DRIVERS = ('sync', 'async')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_TIMEOUT = float(os.getenv('DB_TIMEOUT', '5'))
+ADMIN_TELEGRAM_IDS = os.getenv('ADMIN_TELEGRAM_IDS', '').split(',')
+STALE_HOURS = float(os.getenv('STALE_HOURS', '4'))
+ROUTE_MEMORY_BUDGET_KB = int(os.getenv('ROUTE_MEMORY_BUDGET_KB', '2048'))
+ROUTE_POINTS_PER_USER = int(os.getenv('ROUTE_POINTS_PER_USER', '720'))
+
+# Mühendislerin son konumları (her kayıtta güncellenir, açılışta MySQL'den yüklenir)
+position_index = LatestPositionIndex()
+
+# Mühendislerin günlük rotaları (kayıtlarla aynı veriden beslenir)
+route_store = RouteStore(ROUTE_MEMORY_BUDGET_KB * 1024, ROUTE_POINTS_PER_USER)
+
+# DB_DRIVER=async iken aiomysql bağlantı havuzu (post_init'te açılır)
+async_pool = None
+
+# ===========================================
+# SORGULAR
+# ===========================================
+WHITELIST_QUERY = """
+    SELECT tum.user_id, u.user_type 
+    FROM telegram_user_mapping tum
+    JOIN users u ON tum.user_id = u.id
+    WHERE tum.telegram_user_id = %s 
+    AND tum.is_active = 1
+    LIMIT 1
+"""
+
+INSERT_VISIT_QUERY = """
+    INSERT INTO field_visits 
+    (user_id, telegram_user_id, latitude, longitude, visit_date, maps_link, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, NOW())
+"""
+
+# Her aktif mühendisin en yeni kaydı; iş zaman penceresiyle değil mühendis sayısıyla sınırlı.
+# İlişkili alt sorgu idx_fv_telegram_date üzerinden kullanıcı başına tek indeks okumasıdır.
+POSITION_INDEX_QUERY = """
+    SELECT tum.telegram_user_id, u.name, fv.latitude, fv.longitude, fv.visit_date
+    FROM telegram_user_mapping tum
+    JOIN users u ON tum.user_id = u.id
+    LEFT JOIN field_visits fv
+        ON fv.telegram_user_id = tum.telegram_user_id
+        AND fv.visit_date = (
+            SELECT fv2.visit_date
+            FROM field_visits fv2
+            WHERE fv2.telegram_user_id = tum.telegram_user_id
+            ORDER BY fv2.visit_date DESC
+            LIMIT 1
+        )
+    WHERE tum.is_active = 1
+    AND u.user_type <> 'customer'
+"""
+
+# Bugünkü rotalar; rota bütçesine sığan en yeni noktalar
+TODAY_ROUTE_QUERY = """
+    SELECT telegram_user_id, latitude, longitude, visit_date
+    FROM field_visits
+    WHERE visit_date >= CURDATE()
+    ORDER BY visit_date DESC
+    LIMIT %s
+"""
+
+# Raporlamadaki kullanıcı bazlı tarih aralığı taraması
+USER_RANGE_QUERY = """
+    SELECT latitude, longitude, visit_date
+    FROM field_visits
+    WHERE user_id = %s
+    AND visit_date BETWEEN %s AND %s
+"""
 
 # ===========================================
 # MYSQL BAĞLANTISI
@@ -65,16 +140,7 @@ def save_location_to_db(telegram_id: int, user_name: str, latitude: float, longi
         cursor = connection.cursor()
         
         # 🔒 WHİTELİST KONTROLÜ
-        check_query = """
-            SELECT tum.user_id, u.user_type 
-            FROM telegram_user_mapping tum
-            JOIN users u ON tum.user_id = u.id
-            WHERE tum.telegram_user_id = %s 
-            AND tum.is_active = 1
-            LIMIT 1
-        """
-        
-        cursor.execute(check_query, (telegram_id,))
+        cursor.execute(WHITELIST_QUERY, (telegram_id,))
         user_mapping = cursor.fetchone()
         
         # ❌ Kullanıcı whitelist'te değil
@@ -94,16 +160,11 @@ def save_location_to_db(telegram_id: int, user_name: str, latitude: float, longi
             return False
         
         # ✅ Konumu kaydet
-        visit_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        google_maps_url = f"https://www.google.com/maps?q={latitude},{longitude}"
-        
-        insert_query = """
-            INSERT INTO field_visits 
-            (user_id, telegram_user_id, latitude, longitude, visit_date, maps_link, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
-        """
+        now = datetime.now()
+        visit_date = now.strftime("%Y-%m-%d %H:%M:%S")
+        google_maps_url = maps_link(latitude, longitude)
         
-        cursor.execute(insert_query, (
+        cursor.execute(INSERT_VISIT_QUERY, (
             user_id,
             telegram_id,
             latitude,
@@ -116,13 +177,204 @@ def save_location_to_db(telegram_id: int, user_name: str, latitude: float, longi
         cursor.close()
         connection.close()
         
-        logger.info(f"✅ Konum kaydedildi: {user_name} | {latitude},{longitude}")
+        remember_location(telegram_id, user_name, latitude, longitude, now)
         return True
         
     except Error as e:
         logger.error(f"❌ Konum kaydetme hatası: {e}")
         return False
 
+def remember_location(telegram_id: int, user_name: str, latitude: float, longitude: float, now: datetime):
+    """Kaydedilen konumu bellekteki indeks ve rotaya işle"""
+    position_index.update(telegram_id, user_name, latitude, longitude, now)
+    route_store.add(telegram_id, latitude, longitude, now)
+    logger.info(f"✅ Konum kaydedildi: {user_name} | {latitude},{longitude}")
+
+# ===========================================
+# ASYNC MYSQL (DB_DRIVER=async)
+# ===========================================
+async def open_async_pool(application: Application):
+    """aiomysql bağlantı havuzunu aç"""
+    global async_pool
+    import aiomysql
+    
+    async_pool = await asyncio.wait_for(aiomysql.create_pool(
+        host=DB_HOST,
+        port=int(DB_PORT),
+        db=DB_NAME,
+        user=DB_USER,
+        password=DB_PASS,
+        minsize=1,
+        maxsize=DB_POOL_SIZE,
+        connect_timeout=DB_TIMEOUT,
+        autocommit=True
+    ), timeout=DB_TIMEOUT)
+    logger.info(f"✅ Async MySQL havuzu açıldı (en fazla {DB_POOL_SIZE} bağlantı)")
+
+async def close_async_pool(application: Application):
+    """aiomysql bağlantı havuzunu kapat"""
+    if async_pool is not None:
+        async_pool.close()
+        await async_pool.wait_closed()
+        logger.info("✅ Async MySQL havuzu kapatıldı")
+
+async def _save_location_async(telegram_id: int, user_name: str, latitude: float, longitude: float):
+    async with async_pool.acquire() as connection:
+        try:
+            async with connection.cursor() as cursor:
+                # 🔒 WHİTELİST KONTROLÜ
+                await cursor.execute(WHITELIST_QUERY, (telegram_id,))
+                user_mapping = await cursor.fetchone()
+                
+                # ❌ Kullanıcı whitelist'te değil
+                if not user_mapping:
+                    logger.warning(f"⚠️  Yetkisiz kullanıcı: {user_name} (ID: {telegram_id})")
+                    return False
+                
+                user_id, user_type = user_mapping
+                
+                # ❌ Müşteri ise kaydetme
+                if user_type == 'customer':
+                    logger.warning(f"⚠️  Müşteri atlandı: {user_name} (ID: {telegram_id})")
+                    return False
+                
+                # ✅ Konumu kaydet (havuz autocommit açık)
+                now = datetime.now()
+                await cursor.execute(INSERT_VISIT_QUERY, (
+                    user_id,
+                    telegram_id,
+                    latitude,
+                    longitude,
+                    now.strftime("%Y-%m-%d %H:%M:%S"),
+                    maps_link(latitude, longitude)
+                ))
+        
+        except (asyncio.CancelledError, Exception):
+            # Sorgu ortasında kesilen bağlantıda okunmamış sonuç kalabilir;
+            # havuza dönüp başka kullanıcının kaydına karışmasın diye kapatılır
+            connection.close()
+            raise
+    
+    remember_location(telegram_id, user_name, latitude, longitude, now)
+    return True
+
+async def save_location_to_db_async(telegram_id: int, user_name: str, latitude: float, longitude: float):
+    """Konumu aiomysql havuzu üzerinden kaydet (event loop'u bloklamaz)"""
+    if async_pool is None:
+        logger.error("❌ Async MySQL havuzu yok")
+        return False
+    
+    try:
+        return await asyncio.wait_for(
+            _save_location_async(telegram_id, user_name, latitude, longitude),
+            timeout=DB_TIMEOUT
+        )
+    
+    except asyncio.TimeoutError:
+        logger.error(f"❌ Konum kaydetme zaman aşımı ({DB_TIMEOUT:g} sn): {user_name} (ID: {telegram_id})")
+        return False
+    except Exception as e:
+        logger.error(f"❌ Konum kaydetme hatası: {e}")
+        return False
+
+# ===========================================
+# ŞEMA KONTROLÜ
+# ===========================================
+def check_schema():
+    """Bekleyen migration'ları, eksik aylık bölümleri ve tam tabloya düşen sorgu planlarını logla (salt okunur)"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            logger.error("❌ Database bağlantısı yok, şema kontrolü atlandı")
+            return
+        
+        cursor = connection.cursor()
+        pending = pending_migrations(cursor)
+        if pending:
+            names = ", ".join(f"{version:03d}_{name}" for version, name, _ in pending)
+            logger.warning(f"⚠️  Bekleyen migration var: {names} (python migrate.py)")
+        
+        # Aylık bölüm açılmamışsa kayıtlar silinemeyen p_future'a düşer
+        partitions = list_partitions(cursor)
+        if partitions:
+            missing = missing_partition_months(partitions)
+            if missing:
+                months = ", ".join(f"{month:%Y-%m}" for month in missing)
+                logger.warning(f"⚠️  field_visits aylık bölümü eksik: {months} (python migrate.py aylık çalıştırılmalı)")
+        cursor.close()
+        
+        cursor = connection.cursor(dictionary=True)
+        today = datetime.now().strftime("%Y-%m-%d")
+        plans = (
+            ("whitelist", WHITELIST_QUERY, (0,)),
+            ("son konum indeksi", POSITION_INDEX_QUERY, ()),
+            ("bugünkü rotalar", TODAY_ROUTE_QUERY, (ROUTE_POINTS_PER_USER,)),
+            ("kullanıcı tarih aralığı", USER_RANGE_QUERY, (0, today, today)),
+        )
+        for label, query, params in plans:
+            cursor.execute("EXPLAIN " + query, params)
+            for row in cursor.fetchall():
+                if row.get('type') == 'ALL':
+                    logger.warning(
+                        f"⚠️  Tam tablo taraması ({label}): {row.get('table')} "
+                        f"~{row.get('rows')} satır, olası indeksler: {row.get('possible_keys')}"
+                    )
+        
+        cursor.close()
+        connection.close()
+        
+    except Error as e:
+        logger.error(f"❌ Şema kontrolü hatası: {e}")
+
+# ===========================================
+# SON KONUM İNDEKSİ
+# ===========================================
+def load_position_index():
+    """Son konum indeksini aktif eşlemelerden, bugünkü rotaları bugünün kayıtlarından doldur"""
+    try:
+        connection = get_db_connection()
+        if not connection:
+            logger.error("❌ Database bağlantısı yok, konum indeksi boş başlıyor")
+            return
+        
+        cursor = connection.cursor()
+        
+        cursor.execute(POSITION_INDEX_QUERY)
+        for telegram_id, name, latitude, longitude, visit_date in cursor:
+            telegram_id = int(telegram_id)
+            if visit_date is None:
+                position_index.add_user(telegram_id, name)
+            else:
+                position_index.update(telegram_id, name, float(latitude), float(longitude), visit_date)
+        
+        cursor.execute(TODAY_ROUTE_QUERY, (route_store.max_users * route_store.points_per_user,))
+        today_points = [
+            (int(telegram_id), float(latitude), float(longitude), visit_date)
+            for telegram_id, latitude, longitude, visit_date in cursor
+        ]
+        
+        cursor.close()
+        connection.close()
+        
+        # Sorgu yeniden eskiye sıralı, rotalar eskiden yeniye beslenir
+        for point in reversed(today_points):
+            route_store.add(*point)
+        
+        logger.info(
+            f"✅ Konum indeksi yüklendi: {len(position_index)} kullanıcı, "
+            f"{len(position_index.missing())} konumsuz, {len(route_store)} günlük rota"
+        )
+        
+    except Error as e:
+        logger.error(f"❌ Konum indeksi yükleme hatası: {e}")
+
+# ===========================================
+# ADMIN KONTROL
+# ===========================================
+def is_admin(telegram_id: int) -> bool:
+    """Kullanıcı admin mi kontrol et"""
+    return str(telegram_id) in ADMIN_TELEGRAM_IDS
+
 # ===========================================
 # TELEGRAM BOT KOMUTLARI
 # ===========================================
@@ -133,13 +385,21 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     logger.info(f"👤 /start komutu: {user_name} (ID: {telegram_id})")
     
-    await update.message.reply_text(
+    message = (
         f"✅ Merhaba {user_name}!\n\n"
         "Saha ziyareti sırasında konumunuzu paylaşabilirsiniz.\n\n"
         "📍 Telegram'ın konum paylaşma özelliğini kullanarak "
         "anlık konumunuzu gönderin.\n\n"
         "🔒 Sadece yetkili kullanıcıların konumları kaydedilir."
     )
+    
+    if is_admin(telegram_id):
+        message += "\n\n🔧 Admin Komutları:\n"
+        message += "/where - Mühendislerin son konumları\n"
+        message += "/route <isim> - Bugünkü rota ve mesafe\n"
+        message += f"/stale [saat] - {STALE_HOURS:g} saattir konum göndermeyenler"
+    
+    await update.message.reply_text(message)
 
 async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Konum mesajlarını işle"""
@@ -154,10 +414,13 @@ async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
     longitude = location.longitude
     
     # MySQL'e kaydet (whitelist kontrolü fonksiyon içinde)
-    success = save_location_to_db(telegram_id, user_name, latitude, longitude)
+    if DB_DRIVER == 'async':
+        success = await save_location_to_db_async(telegram_id, user_name, latitude, longitude)
+    else:
+        success = save_location_to_db(telegram_id, user_name, latitude, longitude)
     
     if success:
-        google_maps_url = f"https://www.google.com/maps?q={latitude},{longitude}"
+        google_maps_url = maps_link(latitude, longitude)
         await update.message.reply_text(
             f"✅ Konum başarıyla kaydedildi!\n\n"
             f"👤 {user_name}\n"
@@ -172,6 +435,71 @@ async def handle_location(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Yalnızca yetkili kullanıcılar konum gönderebilir."
         )
 
+async def where_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mühendislerin son konumlarını göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"🗺️ /where komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    for message in format_where(position_index.latest(), STALE_HOURS):
+        await update.message.reply_text(message, disable_web_page_preview=True)
+
+async def route_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bir mühendisin bugünkü rotasını göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"🛣️ /route komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    if not context.args:
+        await update.message.reply_text("❌ Kullanım: /route <isim veya Telegram ID>")
+        return
+    
+    query = " ".join(context.args)
+    matches = position_index.find(query)
+    if not matches:
+        await update.message.reply_text(f"❌ Kullanıcı bulunamadı: {query}")
+        return
+    if len(matches) > 1:
+        await update.message.reply_text(format_candidates(query, matches))
+        return
+    
+    target_id, position = matches[0]
+    await update.message.reply_text(
+        format_route(position.name, route_store.today(target_id), route_store.wrapped(target_id), position.timestamp),
+        disable_web_page_preview=True
+    )
+
+async def stale_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Uzun süredir konum göndermeyenleri göster (sadece admin)"""
+    telegram_id = update.effective_user.id
+    user_name = update.effective_user.full_name
+    
+    logger.info(f"⏰ /stale komutu: {user_name} (ID: {telegram_id})")
+    
+    if not is_admin(telegram_id):
+        await update.message.reply_text("❌ Bu komutu kullanma yetkiniz yok!")
+        return
+    
+    hours = STALE_HOURS
+    if context.args:
+        hours = parse_stale_hours(context.args[0])
+        if hours is None:
+            await update.message.reply_text("❌ Kullanım: /stale [saat]")
+            return
+    
+    for message in format_stale(position_index.stale(hours), hours, position_index.missing()):
+        await update.message.reply_text(message)
+
 # ===========================================
 # ANA FONKSİYON
 # ===========================================
@@ -179,14 +507,31 @@ def main():
     """Bot'u başlat"""
     logger.info("🚀 Bot başlatılıyor...")
     logger.info("🔒 Güvenlik: Whitelist kontrolü AKTİF")
-    logger.info("💾 Veritabanı: MySQL Direkt Kayıt")
+    if DB_DRIVER not in DB_DRIVERS:
+        logger.error(f"❌ Geçersiz DB_DRIVER: {DB_DRIVER!r} (geçerli değerler: {', '.join(DB_DRIVERS)})")
+        raise SystemExit(1)
+    
+    logger.info(f"💾 Veritabanı: MySQL Direkt Kayıt (sürücü: {DB_DRIVER})")
     logger.info("📊 Google Sheets: KULLANILMIYOR")
     
+    # Şema ve indeks kontrolü
+    check_schema()
+    
+    # Son konum indeksini yükle
+    load_position_index()
+    
     # Application oluştur
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    builder = Application.builder().token(TELEGRAM_TOKEN)
+    if DB_DRIVER == 'async':
+        # Farklı kullanıcıların kayıtları havuzdaki bağlantılarda eşzamanlı ilerler
+        builder = builder.concurrent_updates(DB_POOL_SIZE).post_init(open_async_pool).post_shutdown(close_async_pool)
+    application = builder.build()
     
     # Handler'ları ekle
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("where", where_command))
+    application.add_handler(CommandHandler("route", route_command))
+    application.add_handler(CommandHandler("stale", stale_command))
     application.add_handler(MessageHandler(filters.LOCATION, handle_location))
     
     # Bot'u çalıştır
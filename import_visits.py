@@ -0,0 +1,336 @@
+import os
+import csv
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+import mysql.connector
+from mysql.connector import Error
+from location_index import maps_link
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# ===========================================
+# LOGGER AYARLARI
+# ===========================================
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ===========================================
+# ENVIRONMENT VARIABLES
+# ===========================================
+DB_HOST = os.getenv('DB_HOST')
+DB_NAME = os.getenv('DB_NAME')
+DB_USER = os.getenv('DB_USER')
+DB_PASS = os.getenv('DB_PASS')
+DB_PORT = os.getenv('DB_PORT', '3306')
+GOOGLE_SHEET_NAME = os.getenv('GOOGLE_SHEET_NAME', 'Deren Kimya Saha Ziyaret Optimizasyonu')
+
+SHEET_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+SHEET_READ_CHUNK = 5000
+
+# ===========================================
+# MYSQL BAĞLANTISI
+# ===========================================
+def get_db_connection():
+    """MySQL bağlantısı oluştur"""
+    try:
+        connection = mysql.connector.connect(
+            host=DB_HOST,
+            port=int(DB_PORT),
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASS
+        )
+
+        if connection.is_connected():
+            logger.info("✅ MySQL bağlantısı başarılı")
+            return connection
+
+    except Error as e:
+        logger.error(f"❌ MySQL bağlantı hatası: {e}")
+        return None
+
+# ===========================================
+# KAYNAK OKUYUCULAR
+# ===========================================
+# Her okuyucu (telegram_id, latitude, longitude, visit_date) üretir;
+# okunamayan satırlar None olarak gelir ki sıra numarası (devam noktası) kaymasın.
+
+def parse_datetime(value: str) -> datetime:
+    """ISO veya Sheets (gg.aa.yyyy ss:dd:ss) formatındaki tarihi çöz
+
+    Sonuç saniyeye yuvarlanmış, saat dilimsiz yerel saattir; tekrar kontrolü,
+    aralık sorgusu ve INSERT aynı değeri kullanır (visit_date DATETIME, saniye hassasiyetli).
+    """
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        parsed = datetime.strptime(value, SHEET_DATE_FORMAT)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.replace(microsecond=0)
+
+def parse_sheet_row(row):
+    """save_location_to_sheets sütun düzenindeki satırı çöz (A: tarih, C: Telegram ID, E/F: konum)"""
+    try:
+        return int(row[2]), float(row[4]), float(row[5]), parse_datetime(row[0])
+    except (IndexError, ValueError):
+        return None
+
+def read_sheet_csv(path: str):
+    """Sheets sekmesinden indirilmiş CSV (başlık satırı kendiliğinden atlanır)"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            yield parse_sheet_row(row)
+
+def read_sheet_tab(tab_name: str):
+    """Google Sheets sekmesini parça parça oku"""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds_dict = json.loads(os.environ['GOOGLE_CREDENTIALS_JSON'])
+    scope = [
+        'https://spreadsheets.google.com/feeds',
+        'https://www.googleapis.com/auth/spreadsheets',
+        'https://www.googleapis.com/auth/drive'
+    ]
+    creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
+    worksheet = gspread.authorize(creds).open(GOOGLE_SHEET_NAME).worksheet(tab_name)
+
+    start = 1
+    while True:
+        rows = worksheet.get_values(f"A{start}:H{start + SHEET_READ_CHUNK - 1}")
+        for row in rows:
+            yield parse_sheet_row(row)
+        if len(rows) < SHEET_READ_CHUNK:
+            break
+        start += SHEET_READ_CHUNK
+
+def read_csv(path: str):
+    """telegram_user_id, latitude, longitude, visit_date başlıklı CSV"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            try:
+                yield (
+                    int(row['telegram_user_id']),
+                    float(row['latitude']),
+                    float(row['longitude']),
+                    parse_datetime(row['visit_date'])
+                )
+            except (KeyError, TypeError, ValueError):
+                yield None
+
+def parse_telegram_message(message):
+    """Telegram sohbet dışa aktarımındaki konum mesajını çöz"""
+    location = message.get('location_information')
+    from_id = str(message.get('from_id', ''))
+    if not location or not from_id.startswith('user'):
+        return None
+    try:
+        return (
+            int(from_id[len('user'):]),
+            float(location['latitude']),
+            float(location['longitude']),
+            parse_datetime(message['date'])
+        )
+    except (KeyError, ValueError):
+        return None
+
+def read_telegram_export(path: str):
+    """Telegram Desktop result.json (ijson kuruluysa akış halinde okunur)"""
+    with open(path, 'rb') as f:
+        if ijson is not None:
+            messages = ijson.items(f, 'messages.item')
+        else:
+            logger.warning("⚠️ ijson kurulu değil, dışa aktarım tamamen belleğe okunuyor")
+            messages = json.load(f).get('messages', [])
+        for message in messages:
+            yield parse_telegram_message(message)
+
+def open_source(args):
+    """Komut satırı seçeneklerine göre okuyucuyu seç"""
+    if args.sheet_tab:
+        return read_sheet_tab(args.sheet_tab)
+
+    source_format = args.format
+    if not source_format:
+        source_format = 'telegram' if args.source.lower().endswith('.json') else 'csv'
+
+    if source_format == 'telegram':
+        return read_telegram_export(args.source)
+    if source_format == 'sheet':
+        return read_sheet_csv(args.source)
+    return read_csv(args.source)
+
+# ===========================================
+# DEVAM NOKTASI
+# ===========================================
+def load_state(path: str) -> int:
+    """Daha önce işlenmiş kayıt sayısını oku"""
+    try:
+        with open(path) as f:
+            return int(json.load(f).get('offset', 0))
+    except FileNotFoundError:
+        return 0
+
+def save_state(path: str, offset: int):
+    """İşlenen kayıt sayısını atomik olarak yaz"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'offset': offset, 'updated_at': datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+# ===========================================
+# TOPLU YÜKLEME
+# ===========================================
+def load_user_mapping(cursor):
+    """Aktif Telegram ID -> user_id eşlemesini tek sorguyla yükle (müşteriler hariç)"""
+    cursor.execute("""
+        SELECT tum.telegram_user_id, tum.user_id
+        FROM telegram_user_mapping tum
+        JOIN users u ON tum.user_id = u.id
+        WHERE tum.is_active = 1
+        AND u.user_type <> 'customer'
+    """)
+    return {int(telegram_id): user_id for telegram_id, user_id in cursor}
+
+def visit_key(telegram_id: int, latitude: float, longitude: float, visit_date: datetime):
+    """Tekrar kontrolü için kayıt anahtarı"""
+    return (int(telegram_id), visit_date, round(float(latitude), 6), round(float(longitude), 6))
+
+def filter_existing(cursor, batch):
+    """Veritabanında zaten olan ve parti içinde tekrar eden kayıtları ayıkla"""
+    telegram_ids = sorted({row[1] for row in batch})
+    placeholders = ", ".join(["%s"] * len(telegram_ids))
+    cursor.execute(f"""
+        SELECT telegram_user_id, latitude, longitude, visit_date
+        FROM field_visits
+        WHERE telegram_user_id IN ({placeholders})
+        AND visit_date BETWEEN %s AND %s
+    """, (*telegram_ids, min(row[4] for row in batch), max(row[4] for row in batch)))
+
+    seen = {visit_key(*row) for row in cursor}
+    fresh = []
+    for row in batch:
+        key = visit_key(row[1], row[2], row[3], row[4])
+        if key not in seen:
+            seen.add(key)
+            fresh.append(row)
+    return fresh
+
+def insert_batch(connection, cursor, batch, dry_run: bool) -> int:
+    """Partiyi tek çok satırlı INSERT ile yaz, eklenen satır sayısını döner"""
+    if not batch:
+        return 0
+    fresh = filter_existing(cursor, batch)
+    if fresh and not dry_run:
+        insert_query = """
+            INSERT INTO field_visits
+            (user_id, telegram_user_id, latitude, longitude, visit_date, maps_link, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        """
+        cursor.executemany(insert_query, [
+            (user_id, telegram_id, latitude, longitude, visit_date.strftime("%Y-%m-%d %H:%M:%S"), maps_link(latitude, longitude))
+            for user_id, telegram_id, latitude, longitude, visit_date in fresh
+        ])
+        connection.commit()
+    return len(fresh)
+
+def run_import(args):
+    """Kaynağı akış halinde oku, partiler halinde yükle"""
+    state_file = args.state_file or f"{args.source or args.sheet_tab}.import-state"
+    offset = 0 if args.restart else load_state(state_file)
+    if offset:
+        logger.info(f"↩️ Kaldığı yerden devam: {offset} kayıt atlanıyor")
+
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    cursor = connection.cursor()
+    mapping = load_user_mapping(cursor)
+    logger.info(f"👥 {len(mapping)} aktif kullanıcı eşlemesi yüklendi")
+
+    stats = {'inserted': 0, 'duplicates': 0, 'skipped': 0, 'unauthorized': 0}
+    started = time.monotonic()
+    batch = []
+    position = offset
+
+    def flush():
+        inserted = insert_batch(connection, cursor, batch, args.dry_run)
+        stats['inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+        batch.clear()
+        if not args.dry_run:
+            save_state(state_file, position)
+        rate = (position - offset) / max(time.monotonic() - started, 1e-6)
+        logger.info(
+            f"📦 {position} kayıt işlendi | eklenen: {stats['inserted']} | tekrar: {stats['duplicates']} | "
+            f"atlanan: {stats['skipped']} | yetkisiz: {stats['unauthorized']} | {rate:.0f} kayıt/sn"
+        )
+
+    try:
+        for index, record in enumerate(open_source(args)):
+            if index < offset:
+                continue
+            position = index + 1
+
+            if record is None:
+                stats['skipped'] += 1
+                continue
+
+            telegram_id, latitude, longitude, visit_date = record
+            user_id = mapping.get(telegram_id)
+            if user_id is None:
+                stats['unauthorized'] += 1
+                continue
+
+            batch.append((user_id, telegram_id, latitude, longitude, visit_date))
+            if len(batch) >= args.batch_size:
+                flush()
+
+        if batch or position > offset:
+            flush()
+
+    except Error as e:
+        logger.error(f"❌ Toplu yükleme hatası: {e} (tekrar çalıştırınca son partiden devam eder)")
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+    logger.info(f"✅ İçe aktarma tamamlandı: {stats}")
+    return True
+
+# ===========================================
+# ANA FONKSİYON
+# ===========================================
+def main():
+    """Geçmiş konumları field_visits tablosuna toplu aktar"""
+    parser = argparse.ArgumentParser(description="Geçmiş saha ziyaretlerini field_visits tablosuna toplu aktarır")
+    parser.add_argument('source', nargs='?', help="Telegram result.json, Sheets CSV'si veya genel CSV dosyası")
+    parser.add_argument('--format', choices=['telegram', 'sheet', 'csv'],
+                        help="Kaynak biçimi (varsayılan: .json -> telegram, diğerleri -> csv)")
+    parser.add_argument('--sheet-tab', help="Doğrudan okunacak Google Sheets sekmesi (GOOGLE_SHEET_NAME içinde)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Tek INSERT'teki satır sayısı")
+    parser.add_argument('--state-file', help="Devam noktası dosyası (varsayılan: <kaynak>.import-state)")
+    parser.add_argument('--restart', action='store_true', help="Devam noktasını yok sayıp baştan başla")
+    parser.add_argument('--dry-run', action='store_true', help="Veritabanına yazmadan say")
+    args = parser.parse_args()
+
+    if not args.source and not args.sheet_tab:
+        parser.error("Kaynak dosya veya --sheet-tab gerekli")
+
+    raise SystemExit(0 if run_import(args) else 1)
+
+if __name__ == '__main__':
+    main()
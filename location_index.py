@@ -0,0 +1,187 @@
+import math
+from datetime import datetime, timedelta
+
+# Google Maps çok noktalı linkte en fazla bu kadar durak gösterir
+MAPS_MAX_POINTS = 10
+
+# Telegram tek mesajda en fazla bu kadar karakter kabul eder
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# /stale için kabul edilen en büyük süre (saat)
+MAX_STALE_HOURS = 24 * 365
+
+
+def maps_link(latitude: float, longitude: float) -> str:
+    """Tek nokta için Google Maps linki"""
+    return f"https://www.google.com/maps?q={latitude},{longitude}"
+
+
+def maps_multi_link(points) -> str:
+    """Birden fazla nokta için tek Google Maps linki ((lat, lon) listesi)"""
+    points = list(points)[:MAPS_MAX_POINTS]
+    if len(points) == 1:
+        return maps_link(*points[0])
+    return "https://www.google.com/maps/dir/" + "/".join(f"{lat},{lon}" for lat, lon in points)
+
+
+def format_age(timestamp: datetime, now: datetime = None) -> str:
+    """Kaydın üzerinden geçen süreyi okunur yaz"""
+    minutes = max(0, int(((now or datetime.now()) - timestamp).total_seconds() // 60))
+    if minutes < 60:
+        return f"{minutes} dk önce"
+    if minutes < 24 * 60:
+        return f"{minutes // 60} sa {minutes % 60} dk önce"
+    return f"{minutes // (24 * 60)} gün önce"
+
+
+def split_message(blocks, limit: int = TELEGRAM_MESSAGE_LIMIT):
+    """Metin bloklarını Telegram sınırını aşmayan mesajlara böl"""
+    messages = []
+    current = ""
+    for block in blocks:
+        block = block[:limit]
+        candidate = f"{current}\n{block}" if current else block
+        if len(candidate) > limit:
+            messages.append(current)
+            candidate = block
+        current = candidate
+    if current:
+        messages.append(current)
+    return messages
+
+
+def format_where(positions, stale_hours: float, now: datetime = None):
+    """/where yanıtı; (telegram_id, LastPosition) listesinden mesaj listesi üretir"""
+    if not positions:
+        return ["ℹ️ Henüz kayıtlı konum yok."]
+
+    now = now or datetime.now()
+    cutoff = now - timedelta(hours=stale_hours)
+    blocks = ["🗺️ Son Konumlar\n"]
+    for _, position in positions:
+        marker = "⚠️" if position.timestamp < cutoff else "📍"
+        blocks.append(
+            f"{marker} {position.name} - {format_age(position.timestamp, now)}\n"
+            f"{maps_link(position.latitude, position.longitude)}"
+        )
+
+    if len(positions) > 1:
+        points = [(position.latitude, position.longitude) for _, position in positions]
+        blocks.append(f"\n🧭 Tümü (en güncel {min(len(points), MAPS_MAX_POINTS)}):\n{maps_multi_link(points)}")
+
+    return split_message(blocks)
+
+
+def parse_stale_hours(text: str):
+    """/stale argümanını çöz; sonlu, pozitif ve MAX_STALE_HOURS altında değilse None"""
+    try:
+        hours = float(text.replace(",", "."))
+    except ValueError:
+        return None
+    if not math.isfinite(hours) or hours <= 0 or hours > MAX_STALE_HOURS:
+        return None
+    return hours
+
+
+def format_stale(stale, hours: float, missing=(), now: datetime = None):
+    """/stale yanıtı; (telegram_id, LastPosition) ve hiç konum göndermeyen (telegram_id, isim) listelerinden"""
+    if not stale and not missing:
+        return [f"✅ Son {hours:g} saatte herkes konum gönderdi."]
+
+    now = now or datetime.now()
+    blocks = []
+    if stale:
+        blocks.append(f"⏰ {hours:g} saattir konum göndermeyenler\n")
+        for _, position in stale:
+            blocks.append(f"⚠️ {position.name} - {format_age(position.timestamp, now)}")
+    if missing:
+        blocks.append(f"{chr(10) if stale else ''}📭 Hiç konum göndermeyenler\n")
+        for _, name in missing:
+            blocks.append(f"❔ {name}")
+    return split_message(blocks)
+
+
+def format_candidates(query: str, matches) -> str:
+    """Birden fazla kullanıcı eşleştiğinde seçenekleri listele"""
+    lines = [f"❓ \"{query}\" için birden fazla kullanıcı var, ID ile tekrar deneyin:\n"]
+    for telegram_id, position in matches:
+        lines.append(f"👤 {position.name} - ID: {telegram_id}")
+    return "\n".join(lines)[:TELEGRAM_MESSAGE_LIMIT]
+
+
+class LastPosition:
+    """Bir mühendisin bilinen son konumu"""
+    __slots__ = ("name", "latitude", "longitude", "timestamp")
+
+    def __init__(self, name: str, latitude: float, longitude: float, timestamp: datetime):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timestamp = timestamp
+
+
+class LatestPositionIndex:
+    """Telegram ID -> son konum haritası (bellekte, backend okuması yok)"""
+
+    def __init__(self):
+        self._positions = {}
+        # Aktif eşlemesi olup hiç konumu bilinmeyen kullanıcılar: telegram_id -> isim
+        self._missing = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def clear(self):
+        self._positions.clear()
+        self._missing.clear()
+
+    def add_user(self, telegram_id: int, name: str):
+        """Konumu henüz bilinmeyen aktif kullanıcıyı kaydet"""
+        if telegram_id not in self._positions:
+            self._missing[telegram_id] = name or str(telegram_id)
+
+    def missing(self):
+        """Hiç konum göndermeyen (telegram_id, isim) listesi, isme göre sıralı"""
+        return sorted(self._missing.items(), key=lambda item: item[1].lower())
+
+    def update(self, telegram_id: int, name: str, latitude: float, longitude: float, timestamp: datetime):
+        """Konumu güncelle; eski tarihli kayıt yenisinin üzerine yazılmaz"""
+        current = self._positions.get(telegram_id)
+        if current is not None and current.timestamp > timestamp:
+            if name and current.name != name:
+                current.name = name
+            return
+        if not name and current is not None:
+            name = current.name
+        name = name or self._missing.get(telegram_id)
+        self._missing.pop(telegram_id, None)
+        self._positions[telegram_id] = LastPosition(name or str(telegram_id), latitude, longitude, timestamp)
+
+    def get(self, telegram_id: int):
+        return self._positions.get(telegram_id)
+
+    def find(self, query: str):
+        """Telegram ID veya isimle kullanıcı ara, eşleşen (telegram_id, LastPosition) listesi döner
+
+        Tam isim eşleşmesi varsa sadece o döner; yoksa isim parçası içeren herkes döner.
+        """
+        query = query.strip()
+        if query.isdigit() and int(query) in self._positions:
+            return [(int(query), self._positions[int(query)])]
+        lowered = query.lower()
+        if not lowered:
+            return []
+        exact = [item for item in self._positions.items() if item[1].name.lower() == lowered]
+        if exact:
+            return exact
+        return [item for item in self._positions.items() if lowered in item[1].name.lower()]
+
+    def latest(self):
+        """En yeni konum başta olacak şekilde (telegram_id, LastPosition) listesi"""
+        return sorted(self._positions.items(), key=lambda item: item[1].timestamp, reverse=True)
+
+    def stale(self, max_age_hours: float, now: datetime = None):
+        """Son konumu max_age_hours saatten eski olanlar, en eskisi başta"""
+        cutoff = (now or datetime.now()) - timedelta(hours=max_age_hours)
+        stale = [item for item in self._positions.items() if item[1].timestamp < cutoff]
+        return sorted(stale, key=lambda item: item[1].timestamp)
@@ -0,0 +1,248 @@
+import os
+import re
+import logging
+import argparse
+from datetime import date
+import mysql.connector
+from mysql.connector import Error
+
+# ===========================================
+# LOGGER AYARLARI
+# ===========================================
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# ===========================================
+# ENVIRONMENT VARIABLES
+# ===========================================
+DB_HOST = os.getenv('DB_HOST')
+DB_NAME = os.getenv('DB_NAME')
+DB_USER = os.getenv('DB_USER')
+DB_PASS = os.getenv('DB_PASS')
+DB_PORT = os.getenv('DB_PORT', '3306')
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# MySQL TO_DAYS() ile Python date.toordinal() arasındaki fark
+TO_DAYS_OFFSET = 365
+
+# ===========================================
+# MYSQL BAĞLANTISI
+# ===========================================
+def get_db_connection():
+    """MySQL bağlantısı oluştur"""
+    try:
+        connection = mysql.connector.connect(
+            host=DB_HOST,
+            port=int(DB_PORT),
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASS
+        )
+
+        if connection.is_connected():
+            logger.info("✅ MySQL bağlantısı başarılı")
+            return connection
+
+    except Error as e:
+        logger.error(f"❌ MySQL bağlantı hatası: {e}")
+        return None
+
+# ===========================================
+# MIGRATION DOSYALARI
+# ===========================================
+def list_migrations():
+    """migrations/ altındaki dosyalar, sürüm sırasıyla [(version, name, path)]"""
+    migrations = []
+    for file_name in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(file_name)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, file_name)))
+    return sorted(migrations)
+
+def split_statements(sql: str):
+    """SQL dosyasını ';' ile biten ifadelere böl (-- yorum satırları atlanır)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in "\n".join(lines).split(';') if statement.strip()]
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT UNSIGNED NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+def pending_migrations(cursor):
+    """Henüz uygulanmamış migration'lar (salt okunur; schema_migrations yoksa hepsi bekliyor)"""
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'schema_migrations'
+    """)
+    if not cursor.fetchone()[0]:
+        return list_migrations()
+
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+    return [migration for migration in list_migrations() if migration[0] not in applied]
+
+def apply_migrations(connection):
+    """Bekleyen migration'ları sırayla uygula"""
+    cursor = connection.cursor()
+    ensure_migrations_table(cursor)
+    pending = pending_migrations(cursor)
+    if not pending:
+        logger.info("ℹ️ Şema güncel, bekleyen migration yok")
+
+    for version, name, path in pending:
+        logger.info(f"⏳ Migration {version:03d}_{name} uygulanıyor...")
+        with open(path, encoding='utf-8') as f:
+            statements = split_statements(f.read())
+
+        # DDL ifadeleri MySQL'de örtük commit yapar; sürüm her dosyadan sonra kaydedilir
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        connection.commit()
+        logger.info(f"✅ Migration {version:03d}_{name} uygulandı")
+
+    cursor.close()
+
+# ===========================================
+# AYLIK BÖLÜM (PARTITION) BAKIMI
+# ===========================================
+def add_months(day: date, months: int) -> date:
+    """Ayın ilk gününe ay ekle/çıkar"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def list_partitions(cursor):
+    """field_visits bölümleri [(name, üst sınır tarihi veya None=MAXVALUE)]"""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM INFORMATION_SCHEMA.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE()
+        AND TABLE_NAME = 'field_visits'
+        AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = []
+    for name, description in cursor.fetchall():
+        if description == 'MAXVALUE':
+            partitions.append((name, None))
+        else:
+            partitions.append((name, date.fromordinal(int(description) - TO_DAYS_OFFSET)))
+    return partitions
+
+def missing_partition_months(partitions, today: date = None):
+    """Bu ay ve gelecek ay için aylık bölümü olmayan ayların başlangıçları
+
+    Bölümü olmayan ayın kayıtları p_future'a düşer ve hiçbir zaman silinemez.
+    """
+    bounds = [bound for _, bound in partitions if bound is not None]
+    covered_until = max(bounds) if bounds else None
+    this_month = add_months(today or date.today(), 0)
+    months = [this_month, add_months(this_month, 1)]
+    return [month for month in months if covered_until is None or covered_until < add_months(month, 1)]
+
+def ensure_partitions(connection, months_ahead: int):
+    """p_future'ı bölerek önümüzdeki months_ahead ay için aylık bölüm aç"""
+    cursor = connection.cursor()
+    partitions = list_partitions(cursor)
+    if not partitions:
+        logger.warning("⚠️ field_visits bölümlenmemiş, bölüm bakımı atlandı")
+        cursor.close()
+        return
+
+    bounds = [bound for _, bound in partitions if bound is not None]
+    bound = max(bounds) if bounds else add_months(date.today(), 0)
+    target = add_months(date.today(), months_ahead + 1)
+
+    while bound < target:
+        next_bound = add_months(bound, 1)
+        name = f"p{bound:%Y%m}"
+        cursor.execute(f"""
+            ALTER TABLE field_visits REORGANIZE PARTITION p_future INTO (
+                PARTITION {name} VALUES LESS THAN (TO_DAYS('{next_bound:%Y-%m-%d}')),
+                PARTITION p_future VALUES LESS THAN MAXVALUE
+            )
+        """)
+        logger.info(f"✅ Bölüm eklendi: {name}")
+        bound = next_bound
+
+    cursor.close()
+
+def partitions_to_drop(partitions, retain_months: int, today: date = None):
+    """Tamamı retain_months aydan eski bölümler [(name, bound)]; içinde bulunulan ay asla silinmez"""
+    if retain_months < 1:
+        raise ValueError(f"retain_months en az 1 olmalı: {retain_months}")
+    cutoff = add_months(today or date.today(), -retain_months)
+    return [(name, bound) for name, bound in partitions if bound is not None and bound <= cutoff]
+
+def drop_old_partitions(connection, retain_months: int):
+    """Tamamı retain_months aydan eski bölümleri sil"""
+    cursor = connection.cursor()
+
+    for name, bound in partitions_to_drop(list_partitions(cursor), retain_months):
+        cursor.execute(f"ALTER TABLE field_visits DROP PARTITION {name}")
+        logger.info(f"🗑️ Bölüm silindi: {name} (< {bound})")
+
+    cursor.close()
+
+# ===========================================
+# ANA FONKSİYON
+# ===========================================
+def positive_int(value: str) -> int:
+    """argparse için 1 veya daha büyük tam sayı"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tam sayı olmalı: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"en az 1 olmalı: {value}")
+    return number
+
+def main():
+    """Şema migration'larını uygula ve aylık bölümleri yönet"""
+    parser = argparse.ArgumentParser(description="field_visits şema migration'ları ve bölüm bakımı")
+    parser.add_argument('--status', action='store_true', help="Sadece bekleyen migration'ları listele")
+    parser.add_argument('--months-ahead', type=int, default=3, help="Önceden açılacak aylık bölüm sayısı")
+    parser.add_argument('--retain-months', type=positive_int, help="Bu kadar aydan eski bölümleri sil (varsayılan: silme)")
+    args = parser.parse_args()
+
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit(1)
+
+    try:
+        if args.status:
+            cursor = connection.cursor()
+            pending = pending_migrations(cursor)
+            cursor.close()
+            for version, name, _ in pending:
+                logger.info(f"⏳ Bekleyen: {version:03d}_{name}")
+            if not pending:
+                logger.info("ℹ️ Şema güncel, bekleyen migration yok")
+            return
+
+        apply_migrations(connection)
+        ensure_partitions(connection, args.months_ahead)
+        if args.retain_months is not None:
+            drop_old_partitions(connection, args.retain_months)
+
+    except Error as e:
+        logger.error(f"❌ Migration hatası: {e}")
+        raise SystemExit(1)
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
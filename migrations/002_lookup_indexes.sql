@@ -0,0 +1,13 @@
+-- Whitelist kontrolü: telegram_user_id + is_active ile arama, user_id indeksten okunur.
+-- users tarafı PRIMARY KEY üzerinden eq_ref ile birleşir.
+CREATE INDEX idx_tum_telegram_active ON telegram_user_mapping (telegram_user_id, is_active, user_id);
+
+-- Raporlama: kullanıcı bazında tarih aralığı taraması, konum sütunları indekste.
+CREATE INDEX idx_fv_user_date ON field_visits (user_id, visit_date, latitude, longitude);
+
+-- Toplu içe aktarmadaki tekrar kontrolü (import_visits.py) ve açılışta her mühendisin
+-- en yeni kaydının bulunması (bot_mysql.py POSITION_INDEX_QUERY).
+CREATE INDEX idx_fv_telegram_date ON field_visits (telegram_user_id, visit_date, latitude, longitude);
+
+-- Açılışta bugünkü rotaların yüklenmesi (bot_mysql.py TODAY_ROUTE_QUERY).
+CREATE INDEX idx_fv_visit_date ON field_visits (visit_date, telegram_user_id, latitude, longitude);
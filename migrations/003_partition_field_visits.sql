@@ -0,0 +1,18 @@
+-- field_visits aylık RANGE bölümlemesine geçer; eski aylar DROP PARTITION ile anında silinir.
+-- Bölümleme sütunu her benzersiz anahtarda olmalı, bu yüzden birincil anahtar (id, visit_date) olur.
+--
+-- p_history sınırı sabittir çünkü düz SQL migration'ı uygulandığı ayı hesaplayamaz;
+-- 2026-11-01 bu migration yazıldığında ilk tam aydır. Bu tarihten önceki tüm geçmiş tek
+-- bölümde kalır ve tamamı saklama süresini geçince tek seferde silinir. Daha geç uygulanırsa
+-- migrate.py 2026-11'den başlayarak eksik ayları sırayla açar.
+--
+-- Aylık bölümleri migrate.py p_future'dan bölerek açar; ayda bir çalıştırılmalıdır
+-- (python migrate.py --months-ahead N). Açılmayan ayların kayıtları p_future'a düşer ve
+-- DROP PARTITION ile silinemez; bot açılışta bu durumu uyarır.
+
+ALTER TABLE field_visits DROP PRIMARY KEY, ADD PRIMARY KEY (id, visit_date);
+
+ALTER TABLE field_visits PARTITION BY RANGE (TO_DAYS(visit_date)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2026-11-01')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
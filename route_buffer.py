@@ -0,0 +1,194 @@
+import math
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+from location_index import MAPS_MAX_POINTS, maps_multi_link
+
+# Nokta başına bellek: float32 enlem + float32 boylam + int64 zaman damgası
+POINT_BYTES = 4 + 4 + 8
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """İki nokta arası büyük daire mesafesi (metre)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def path_length_m(points) -> float:
+    """(lat, lon) listesinin toplam uzunluğu (metre)"""
+    return sum(haversine_m(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:]))
+
+
+def douglas_peucker(points, tolerance_m: float):
+    """Douglas-Peucker ile sadeleştir, korunan (lat, lon) noktalarını döner"""
+    if len(points) < 3:
+        return list(points)
+
+    # Küçük alanlarda eşdikdörtgen izdüşüm yeterli (metre cinsinden x, y)
+    cos_lat = math.cos(math.radians(points[0][0]))
+    xy = [
+        (math.radians(lon) * cos_lat * EARTH_RADIUS_M, math.radians(lat) * EARTH_RADIUS_M)
+        for lat, lon in points
+    ]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = xy[first]
+        x2, y2 = xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        seg_len_sq = dx * dx + dy * dy
+
+        max_dist, index = 0.0, first
+        for i in range(first + 1, last):
+            px, py = xy[i]
+            if seg_len_sq == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / seg_len_sq))
+                dist = math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+            if dist > max_dist:
+                max_dist, index = dist, i
+
+        if max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_for_link(points, tolerance_m: float = 25.0, max_points: int = MAPS_MAX_POINTS):
+    """Tek harita linkine sığana kadar toleransı artırarak sadeleştir"""
+    simplified = douglas_peucker(points, tolerance_m)
+    while len(simplified) > max_points:
+        tolerance_m *= 2
+        simplified = douglas_peucker(points, tolerance_m)
+    return simplified
+
+
+class RouteRing:
+    """Bir kullanıcının günlük noktaları için sabit kapasiteli halka tampon"""
+    __slots__ = ("day", "capacity", "wrapped", "lat", "lon", "ts")
+
+    def __init__(self, capacity: int, day):
+        self.capacity = capacity
+        self.reset(day)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def reset(self, day):
+        self.day = day
+        self.wrapped = False
+        self.lat = array("f")
+        self.lon = array("f")
+        self.ts = array("q")
+
+    def append(self, latitude: float, longitude: float, timestamp: int):
+        if len(self.ts) < self.capacity:
+            self.lat.append(latitude)
+            self.lon.append(longitude)
+            self.ts.append(timestamp)
+            return
+        # Dolu: zamanca en eski noktanın üzerine yaz. Eşzamanlı kayıtlar sırasız
+        # gelebildiği için ekleme sırası değil zaman damgası esas alınır; böylece
+        # tampon her zaman en yeni `capacity` noktayı tutar.
+        self.wrapped = True
+        oldest = min(range(self.capacity), key=self.ts.__getitem__)
+        if timestamp < self.ts[oldest]:
+            return
+        self.lat[oldest] = latitude
+        self.lon[oldest] = longitude
+        self.ts[oldest] = timestamp
+
+    def points(self):
+        """Zaman sırasına göre (lat, lon, timestamp) listesi"""
+        order = sorted(range(len(self.ts)), key=self.ts.__getitem__)
+        return [(self.lat[i], self.lon[i], self.ts[i]) for i in order]
+
+
+class RouteStore:
+    """Telegram ID -> günlük rota; toplam bellek bütçeyle sınırlı"""
+
+    def __init__(self, budget_bytes: int, points_per_user: int):
+        self.points_per_user = max(2, points_per_user)
+        self.max_users = max(1, budget_bytes // (self.points_per_user * POINT_BYTES))
+        self._rings = OrderedDict()
+
+    def __len__(self):
+        return len(self._rings)
+
+    def clear(self):
+        self._rings.clear()
+
+    def add(self, telegram_id: int, latitude: float, longitude: float, timestamp: datetime):
+        """Noktayı ekle; yeni gün gelince tampon sıfırlanır, eski günler atlanır"""
+        day = timestamp.date()
+        ring = self._rings.get(telegram_id)
+        if ring is None:
+            if len(self._rings) >= self.max_users:
+                # Bütçe dolu: en uzun süredir güncellenmeyen kullanıcıyı at
+                self._rings.popitem(last=False)
+            ring = RouteRing(self.points_per_user, day)
+            self._rings[telegram_id] = ring
+        elif day < ring.day:
+            return
+        elif day > ring.day:
+            ring.reset(day)
+
+        self._rings.move_to_end(telegram_id)
+        ring.append(latitude, longitude, int(timestamp.timestamp()))
+
+    def today(self, telegram_id: int, now: datetime = None):
+        """Kullanıcının bugünkü noktaları (lat, lon, datetime) listesi
+
+        Kullanıcının tamponu hiç yoksa (hiç nokta gelmedi veya bütçe nedeniyle atıldı) None döner.
+        """
+        ring = self._rings.get(telegram_id)
+        if ring is None:
+            return None
+        if ring.day != (now or datetime.now()).date():
+            return []
+        return [(lat, lon, datetime.fromtimestamp(ts)) for lat, lon, ts in ring.points()]
+
+    def wrapped(self, telegram_id: int) -> bool:
+        """Tampon dolup günün ilk noktalarının üzerine yazıldı mı"""
+        ring = self._rings.get(telegram_id)
+        return ring is not None and ring.wrapped
+
+
+def format_route(name: str, points, wrapped: bool = False, last_seen: datetime = None, now: datetime = None) -> str:
+    """/route yanıtı; (lat, lon, datetime) listesinden tek mesaj üretir
+
+    points None ise tampon yoktur; last_seen bugünse rota bellek bütçesi yüzünden atılmıştır.
+    """
+    if points is None and last_seen is not None and last_seen.date() == (now or datetime.now()).date():
+        return (
+            f"⚠️ {name} bugün konum gönderdi (son: {last_seen:%H:%M}) ama rotası "
+            f"bellek sınırı nedeniyle bellekten atıldı."
+        )
+    if not points:
+        return f"ℹ️ {name} bugün konum göndermedi."
+
+    path = [(lat, lon) for lat, lon, _ in points]
+    simplified = simplify_for_link(path)
+    distance_km = path_length_m(path) / 1000
+
+    message = (
+        f"🛣️ {name} - Bugünkü Rota\n\n"
+        f"🕒 {points[0][2]:%H:%M} - {points[-1][2]:%H:%M}\n"
+        f"📍 {len(points)} konum ({len(simplified)} noktaya sadeleştirildi)\n"
+        f"📏 Toplam mesafe: {distance_km:.1f} km\n"
+    )
+    if wrapped:
+        message += f"⚠️ Tampon doldu: sadece {points[0][2]:%H:%M} sonrası gösteriliyor\n"
+    message += f"🗺️ {maps_multi_link((round(lat, 6), round(lon, 6)) for lat, lon in simplified)}"
+    return message
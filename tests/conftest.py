@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Bot modülleri depo kökünde duruyor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
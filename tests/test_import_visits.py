@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from import_visits import parse_datetime, parse_sheet_row, parse_telegram_message, visit_key
+
+
+def test_parse_datetime_drops_microseconds():
+    assert parse_datetime("2025-01-02T10:00:00.500000") == datetime(2025, 1, 2, 10, 0, 0)
+
+
+def test_parse_datetime_converts_offset_to_naive_local():
+    parsed = parse_datetime("2025-01-02T10:00:00+00:00")
+    expected = datetime(2025, 1, 2, 10, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+    assert parsed.tzinfo is None
+    assert parsed == expected
+    # Dilimli ve dilimsiz değerler aynı partide karşılaştırılabilir
+    assert min(parsed, parse_datetime("2025-01-02 09:00:00")) is not None
+
+
+def test_parse_datetime_sheet_format():
+    assert parse_datetime("02.01.2025 10:00:00") == datetime(2025, 1, 2, 10, 0, 0)
+
+
+def test_duplicate_key_matches_stored_row():
+    stored = (42, 40.1, 29.2, datetime(2025, 1, 2, 10, 0, 0))
+    imported = (42, 40.1, 29.2, parse_datetime("2025-01-02T10:00:00.5"))
+    assert visit_key(*stored) == visit_key(*imported)
+
+
+def test_parse_sheet_row_and_telegram_message():
+    assert parse_sheet_row(["Tarih", "Ad", "ID", "Tel", "Enlem", "Boylam"]) is None
+    assert parse_sheet_row(["02.01.2025 10:00:00", "Ali", "42", "", "40.1", "29.2", "", ""]) == (
+        42, 40.1, 29.2, datetime(2025, 1, 2, 10, 0, 0)
+    )
+    message = {
+        "from_id": "user42",
+        "date": "2025-01-02T10:00:00",
+        "location_information": {"latitude": 40.1, "longitude": 29.2},
+    }
+    assert parse_telegram_message(message) == (42, 40.1, 29.2, datetime(2025, 1, 2, 10, 0, 0))
+    assert parse_telegram_message({"from_id": "channel1", "text": "merhaba"}) is None
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+from location_index import (
+    MAPS_MAX_POINTS,
+    TELEGRAM_MESSAGE_LIMIT,
+    LatestPositionIndex,
+    format_age,
+    format_candidates,
+    format_stale,
+    format_where,
+    maps_multi_link,
+    parse_stale_hours,
+    split_message,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_update_keeps_newest_position_and_name():
+    index = LatestPositionIndex()
+    index.update(1, "", 40.0, 29.0, NOW - timedelta(hours=1))
+    index.update(1, "Ali", 41.0, 30.0, NOW - timedelta(hours=2))
+
+    position = index.get(1)
+    assert (position.latitude, position.longitude) == (40.0, 29.0)
+    assert position.name == "Ali"
+
+
+def test_update_without_name_falls_back_to_id():
+    index = LatestPositionIndex()
+    index.update(7, "", 40.0, 29.0, NOW)
+    assert index.get(7).name == "7"
+
+
+def test_find_by_id_and_name():
+    index = LatestPositionIndex()
+    index.update(1, "Ali Yılmaz", 40.0, 29.0, NOW)
+    index.update(2, "Veli", 41.0, 30.0, NOW)
+
+    assert [telegram_id for telegram_id, _ in index.find("2")] == [2]
+    assert [telegram_id for telegram_id, _ in index.find("yılmaz")] == [1]
+    assert index.find("ayşe") == []
+    assert index.find("  ") == []
+
+
+def test_find_prefers_exact_name_and_lists_ambiguous_matches():
+    index = LatestPositionIndex()
+    index.update(1, "Alihan", 40.0, 29.0, NOW)
+    index.update(2, "Ali", 41.0, 30.0, NOW)
+    index.update(3, "Ali Rıza", 42.0, 31.0, NOW)
+
+    assert [telegram_id for telegram_id, _ in index.find("ali")] == [2]
+    assert sorted(telegram_id for telegram_id, _ in index.find("al")) == [1, 2, 3]
+
+    message = format_candidates("al", index.find("al"))
+    assert "Alihan - ID: 1" in message and "Ali Rıza - ID: 3" in message
+
+
+def test_missing_users_until_first_position():
+    index = LatestPositionIndex()
+    index.add_user(5, "Zeynep")
+    index.add_user(6, "")
+    assert index.missing() == [(6, "6"), (5, "Zeynep")]
+
+    index.update(5, "", 40.0, 29.0, NOW)
+    assert index.get(5).name == "Zeynep"
+    assert index.missing() == [(6, "6")]
+
+    index.add_user(5, "Zeynep")
+    assert index.missing() == [(6, "6")]
+
+
+def test_parse_stale_hours():
+    assert parse_stale_hours("4") == 4
+    assert parse_stale_hours("1,5") == 1.5
+    for text in ("abc", "nan", "inf", "-inf", "-3", "0", "1e8"):
+        assert parse_stale_hours(text) is None
+
+
+def test_format_stale_lists_users_without_position():
+    index = LatestPositionIndex()
+    index.update(1, "Eski", 40.0, 29.0, NOW - timedelta(hours=10))
+    index.add_user(2, "Yeni Başlayan")
+
+    text = "\n".join(format_stale(index.stale(4, now=NOW), 4, index.missing(), now=NOW))
+    assert "⚠️ Eski - 10 sa 0 dk önce" in text
+    assert "📭 Hiç konum göndermeyenler" in text
+    assert "❔ Yeni Başlayan" in text
+
+    assert format_stale([], 4, index.missing())[0].startswith("📭")
+
+
+def test_latest_and_stale_ordering():
+    index = LatestPositionIndex()
+    index.update(1, "Eski", 40.0, 29.0, NOW - timedelta(hours=10))
+    index.update(2, "Yeni", 41.0, 30.0, NOW - timedelta(minutes=5))
+    index.update(3, "Orta", 42.0, 31.0, NOW - timedelta(hours=6))
+
+    assert [telegram_id for telegram_id, _ in index.latest()] == [2, 3, 1]
+    assert [telegram_id for telegram_id, _ in index.stale(4, now=NOW)] == [1, 3]
+
+
+def test_clear():
+    index = LatestPositionIndex()
+    index.update(1, "Ali", 40.0, 29.0, NOW)
+    index.add_user(2, "Veli")
+    index.clear()
+    assert len(index) == 0
+    assert index.missing() == []
+
+
+def test_format_age():
+    assert format_age(NOW - timedelta(minutes=5), NOW) == "5 dk önce"
+    assert format_age(NOW - timedelta(minutes=130), NOW) == "2 sa 10 dk önce"
+    assert format_age(NOW - timedelta(days=3), NOW) == "3 gün önce"
+
+
+def test_maps_multi_link_caps_points():
+    link = maps_multi_link([(i, i) for i in range(20)])
+    assert link.startswith("https://www.google.com/maps/dir/")
+    assert len(link.split("/dir/")[1].split("/")) == MAPS_MAX_POINTS
+
+
+def test_split_message_respects_limit():
+    blocks = ["x" * 1000 for _ in range(10)]
+    messages = split_message(blocks)
+
+    assert len(messages) > 1
+    assert all(len(message) <= TELEGRAM_MESSAGE_LIMIT for message in messages)
+    assert sum(message.count("x") for message in messages) == 10000
+
+
+def test_format_where_splits_large_teams():
+    index = LatestPositionIndex()
+    for telegram_id in range(200):
+        index.update(telegram_id, f"Mühendis {telegram_id}", 40.0, 29.0, NOW - timedelta(hours=telegram_id % 8))
+
+    messages = format_where(index.latest(), 4, now=NOW)
+
+    assert len(messages) > 1
+    assert all(len(message) <= TELEGRAM_MESSAGE_LIMIT for message in messages)
+    assert "⚠️ Mühendis 7" in "\n".join(messages)
+
+
+def test_format_where_and_stale_empty():
+    assert format_where([], 4) == ["ℹ️ Henüz kayıtlı konum yok."]
+    assert format_stale([], 4) == ["✅ Son 4 saatte herkes konum gönderdi."]
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+from migrate import (
+    add_months,
+    list_migrations,
+    missing_partition_months,
+    partitions_to_drop,
+    positive_int,
+    split_statements,
+)
+
+
+def test_add_months_crosses_year():
+    assert add_months(date(2026, 12, 15), 1) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 5), -1) == date(2025, 12, 1)
+
+
+def test_split_statements_skips_comments():
+    sql = "-- yorum; burada\nCREATE TABLE a (id INT);\n\nCREATE INDEX i ON a (id);\n"
+    assert split_statements(sql) == ["CREATE TABLE a (id INT)", "CREATE INDEX i ON a (id)"]
+
+
+def test_migrations_are_ordered():
+    versions = [version for version, _, _ in list_migrations()]
+    assert versions == sorted(versions)
+    assert versions[0] == 1
+
+
+def test_missing_partition_months():
+    partitions = [("p_history", date(2026, 11, 1)), ("p_future", None)]
+
+    assert missing_partition_months(partitions, date(2026, 10, 19)) == [date(2026, 11, 1)]
+    assert missing_partition_months(partitions, date(2027, 3, 2)) == [date(2027, 3, 1), date(2027, 4, 1)]
+
+    partitions.insert(1, ("p202611", date(2026, 12, 1)))
+    assert missing_partition_months(partitions, date(2026, 10, 19)) == []
+
+
+PARTITIONS = [
+    ("p_history", date(2026, 11, 1)),
+    ("p202611", date(2026, 12, 1)),
+    ("p202612", date(2027, 1, 1)),
+    ("p202701", date(2027, 2, 1)),
+    ("p_future", None),
+]
+
+
+def test_partitions_to_drop_keeps_retained_months():
+    today = date(2027, 1, 19)
+
+    assert partitions_to_drop(PARTITIONS, 1, today) == [("p_history", date(2026, 11, 1)), ("p202611", date(2026, 12, 1))]
+    assert partitions_to_drop(PARTITIONS, 2, today) == [("p_history", date(2026, 11, 1))]
+    assert partitions_to_drop(PARTITIONS, 12, today) == []
+
+
+def test_partitions_to_drop_never_touches_current_month():
+    dropped = partitions_to_drop(PARTITIONS, 1, date(2027, 1, 19))
+    assert all(bound <= date(2027, 1, 1) for _, bound in dropped)
+    assert "p202701" not in [name for name, _ in dropped]
+    assert "p_future" not in [name for name, _ in dropped]
+
+
+@pytest.mark.parametrize("retain_months", [0, -1])
+def test_partitions_to_drop_rejects_non_positive_retention(retain_months):
+    with pytest.raises(ValueError):
+        partitions_to_drop(PARTITIONS, retain_months, date(2027, 1, 19))
+
+
+def test_retain_months_argument_validation():
+    import argparse
+
+    assert positive_int("3") == 3
+    for value in ("0", "-1", "abc"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            positive_int(value)
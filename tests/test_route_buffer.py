@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from location_index import MAPS_MAX_POINTS
+from route_buffer import (
+    POINT_BYTES,
+    RouteRing,
+    RouteStore,
+    douglas_peucker,
+    format_route,
+    haversine_m,
+    path_length_m,
+    simplify_for_link,
+)
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+def test_haversine_one_degree_latitude():
+    assert abs(haversine_m(40.0, 29.0, 41.0, 29.0) - 111195) < 10
+
+
+def test_path_length_sums_segments():
+    points = [(40.0, 29.0), (40.01, 29.0), (40.02, 29.0)]
+    assert abs(path_length_m(points) - 2 * haversine_m(40.0, 29.0, 40.01, 29.0)) < 1e-6
+
+
+def test_douglas_peucker_drops_collinear_points():
+    points = [(40.0 + i * 0.001, 29.0) for i in range(50)]
+    assert douglas_peucker(points, 5) == [points[0], points[-1]]
+
+
+def test_douglas_peucker_keeps_corner():
+    points = [(40.0 + i * 0.001, 29.0) for i in range(10)] + [(40.009, 29.0 + i * 0.001) for i in range(1, 10)]
+    assert (40.009, 29.0) in douglas_peucker(points, 5)
+
+
+def test_simplify_for_link_fits_maps_limit():
+    points = [(40.0 + i * 0.001, 29.0 + (i % 2) * 0.01) for i in range(200)]
+    simplified = simplify_for_link(points)
+    assert 2 <= len(simplified) <= MAPS_MAX_POINTS
+    assert simplified[0] == points[0] and simplified[-1] == points[-1]
+
+
+def test_ring_wraps_and_keeps_newest():
+    ring = RouteRing(3, NOW.date())
+    for ts in range(5):
+        ring.append(40.0, 29.0, ts)
+
+    assert len(ring) == 3
+    assert ring.wrapped
+    assert [ts for _, _, ts in ring.points()] == [2, 3, 4]
+
+
+def test_ring_sorts_out_of_order_appends():
+    ring = RouteRing(10, NOW.date())
+    for ts in (3, 1, 2):
+        ring.append(40.0, 29.0, ts)
+
+    assert [ts for _, _, ts in ring.points()] == [1, 2, 3]
+    assert not ring.wrapped
+
+
+def test_wrapped_ring_keeps_newest_points_despite_out_of_order_appends():
+    ring = RouteRing(3, NOW.date())
+    for ts in (10, 30, 20):
+        ring.append(40.0, 29.0, ts)
+
+    ring.append(40.0, 29.0, 25)
+    assert [ts for _, _, ts in ring.points()] == [20, 25, 30]
+
+    # Tampondakilerin hepsinden eski gelen nokta atılır
+    ring.append(40.0, 29.0, 5)
+    assert [ts for _, _, ts in ring.points()] == [20, 25, 30]
+
+
+def test_store_day_rollover_and_old_days():
+    store = RouteStore(1024 * 1024, 10)
+    store.add(1, 40.0, 29.0, NOW - timedelta(days=1))
+    store.add(1, 41.0, 30.0, NOW)
+    store.add(1, 42.0, 31.0, NOW - timedelta(days=1))
+
+    points = store.today(1, now=NOW)
+    assert len(points) == 1
+    assert points[0][2] == NOW
+    assert store.today(1, now=NOW + timedelta(days=1)) == []
+    assert store.today(99, now=NOW) is None
+
+
+def test_store_evicts_least_recently_updated_user():
+    store = RouteStore(2 * 10 * POINT_BYTES, 10)
+    assert store.max_users == 2
+
+    store.add(1, 40.0, 29.0, NOW)
+    store.add(2, 40.0, 29.0, NOW)
+    store.add(1, 40.0, 29.0, NOW + timedelta(minutes=1))
+    store.add(3, 40.0, 29.0, NOW)
+
+    assert len(store) == 2
+    assert store.today(2, now=NOW) is None
+    assert len(store.today(1, now=NOW)) == 2
+
+
+def test_store_reports_wrapped_buffer():
+    store = RouteStore(1024 * 1024, 2)
+    for minute in range(3):
+        store.add(1, 40.0, 29.0, NOW + timedelta(minutes=minute))
+
+    assert store.wrapped(1)
+    assert not store.wrapped(2)
+
+
+def test_format_route():
+    points = [(40.0, 29.0, NOW), (40.01, 29.0, NOW + timedelta(hours=1))]
+
+    message = format_route("Ali", points)
+    assert "12:00 - 13:00" in message
+    assert "1.1 km" in message
+    assert "Tampon doldu" not in message
+
+    assert "Tampon doldu" in format_route("Ali", points, wrapped=True)
+    assert format_route("Ali", []) == "ℹ️ Ali bugün konum göndermedi."
+    assert format_route("Ali", None) == "ℹ️ Ali bugün konum göndermedi."
+
+
+def test_format_route_reports_evicted_route():
+    evicted = format_route("Ali", None, last_seen=NOW - timedelta(hours=1), now=NOW)
+    assert "bellek sınırı" in evicted and "11:00" in evicted
+
+    yesterday = format_route("Ali", None, last_seen=NOW - timedelta(days=1), now=NOW)
+    assert yesterday == "ℹ️ Ali bugün konum göndermedi."